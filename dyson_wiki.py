@@ -20,12 +20,19 @@ These must be extracted from the game files. See the module help in
 """
 
 import argparse
+import functools
+from operator import attrgetter
+import os
+from os import path
+import pickle
 import re
 import sys
 
 import dysonsphere
 from dysonsphere import ERecipeType, EItemType
 
+PROTO_SETS = ('ItemProtoSet', 'RecipeProtoSet', 'TechProtoSet')
+
 # These aren't worth importing from a file
 STARTING_RECIPES = [1, 2, 3, 4, 5, 6, 50]
 STARTING_TECHS = [1]
@@ -41,6 +48,10 @@ MADE_FROM = {
     ERecipeType.FRACTIONATE:'分馏设备',
     ERecipeType.RESEARCH:'科研设备',
     None:'未知'}
+# Enum .name goes through a descriptor, which is noticeably slower than a dict
+# lookup when done for every record.
+_RECIPE_TYPE_NAMES = {x: x.name for x in ERecipeType}
+_ITEM_TYPE_NAMES = {x: x.name for x in EItemType}
 # The second part of the tuple is crafting power: The power of the building
 # (Mk.I in the case of Assembler) divided by the crafting speed.
 BUILDINGS = {
@@ -93,6 +104,7 @@ UNLOCK_HACKS = [
     17,  # Energetic Graphite
     37,  # Crystal Silicon
     78]  # Space Warper
+_UNLOCK_HACKS_SET = frozenset(UNLOCK_HACKS)
 
 # Tweaks to the sort-key function, to get the recipe list to sort in a better
 # order.
@@ -125,30 +137,99 @@ SPECIAL_MATERIALS = [
     1012,  # Kimberlite Ore
     1003]  # Silicon Ore
 
+# Parsed (but untranslated) game data is cached here between runs.
+CACHE_FILE = path.join(path.expanduser('~'), '.cache', 'dyson_wiki.pkl')
+# Everything the cached data depends on. This includes dysonsphere.py itself,
+# since it defines the layouts of the pickled classes.
+CACHE_DEPS = ['ItemProtoSet.dat', 'RecipeProtoSet.dat', 'TechProtoSet.dat',
+              'base.txt', 'prototype.txt', dysonsphere.__file__]
+
+def cache_key():
+    """Return a key identifying the current versions of CACHE_DEPS.
+
+    Returns None if any of them can't be stat'ed.
+    """
+    try:
+        return tuple((path.abspath(x), st.st_mtime_ns, st.st_size)
+                     for x in CACHE_DEPS for st in [os.stat(x)])
+    except OSError:
+        return None
+
+def load_game_data(data_types=None, use_cache=True):
+    """Load the (untranslated) game data, going through CACHE_FILE if possible.
+
+    The cache always holds a full load, and is only written by one. When it's
+    valid, the sets not in "data_types" are dropped to match load_all(). The
+    data is cached before translating it, because translate_data() also
+    updates module globals.
+
+    The key is pickled as its own record ahead of the data, so that it can be
+    checked without unpickling data whose classes may have changed since.
+    """
+    key = cache_key() if use_cache else None
+    if key:
+        # Any failure to read the cache just means rebuilding it.
+        try:
+            with open(CACHE_FILE, 'rb') as f:
+                if pickle.load(f) == key:
+                    data = pickle.load(f)
+                    if data_types is not None:
+                        data = data._replace(**{x: None for x in PROTO_SETS
+                                                if x not in data_types})
+                    return data
+        except Exception:  # pylint: disable=broad-except
+            pass
+    data = dysonsphere.load_all('.', data_types)
+    if key and data_types is None:
+        try:
+            os.makedirs(path.dirname(CACHE_FILE), exist_ok=True)
+            tmp_file = CACHE_FILE + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, CACHE_FILE)
+        except OSError:
+            pass
+    return data
+
 def translate_fields(translations, proto_set, fields):
-    """In-place replace text with translations for one proto_set."""
-    for item in proto_set.data_array:
-        for field in fields:
-            val = getattr(item, field)
+    """In-place replace text with translations for one proto_set.
+
+    "fields" is a tuple of attribute names. The loops are ordered field-major,
+    so each field's getter is resolved once before sweeping the items.
+    """
+    tget = translations.get
+    items = proto_set.data_array
+    for field in fields:
+        get = attrgetter(field)
+        for item in items:
+            val = get(item)
             if val:
-                setattr(item, field, translations.get(val, '**' + val + '**'))
+                setattr(item, field, tget(val, '**' + val + '**'))
 
 
 
-def translate_data(data):
-    """In-place translate all text fields in 'data'."""
+def translate_data(data, full=True):
+    """In-place translate all text fields in 'data'.
+
+    If "full" is False, only the names are translated, which is all that the
+    name dumps need.
+    """
     translations = {}
     for line in data.base + data.prototype:
         match = TRANSLATE_RE.fullmatch(line)
         if not match:
             raise RuntimeError(f"Translation line failed to parse: {line}")
         translations[match[1]] = match[2]
-    translate_fields(translations, data.ItemProtoSet,
-                     ['name', 'mining_from', 'produce_from', 'description'])
-    translate_fields(translations, data.RecipeProtoSet, ['name', 'description'])
-    translate_fields(translations, data.TechProtoSet, ['name', 'description', 'conclusion'])
-    for k, text in MADE_FROM.items():
-        MADE_FROM[k] = translations.get(text, text)
+    # Sets that weren't loaded (see main()) are None, and are skipped.
+    for proto_set, fields in (
+            (data.ItemProtoSet, ('name', 'mining_from', 'produce_from', 'description')),
+            (data.RecipeProtoSet, ('name', 'description')),
+            (data.TechProtoSet, ('name', 'description', 'conclusion'))):
+        if proto_set is not None:
+            translate_fields(translations, proto_set, fields if full else ('name',))
+    tget = translations.get
+    MADE_FROM.update({k: tget(text, text) for k, text in MADE_FROM.items()})
     for i, text in enumerate(BUILDING_CATEGORIES):
         BUILDING_CATEGORIES[i] = translations.get(text, text).rstrip(' (0123456789)')
 
@@ -157,10 +238,12 @@ def dump_all(data):
 
     (It's still translated.)
     """
-    for set_name in ['ItemProtoSet', 'RecipeProtoSet', 'TechProtoSet']:
-        print(f'{set_name}:')
-        for item in getattr(data, set_name).data_array:
-            print(f'    {item}')
+    write = sys.stdout.write
+    for set_name, proto_set in (('ItemProtoSet', data.ItemProtoSet),
+                                ('RecipeProtoSet', data.RecipeProtoSet),
+                                ('TechProtoSet', data.TechProtoSet)):
+        write(f'{set_name}:\n')
+        write(''.join([f'    {item}\n' for item in proto_set.data_array]))
 
 def dump_sorted_names(entry_list):
     """Print just the names, sorted.
@@ -172,62 +255,85 @@ def dump_sorted_names(entry_list):
     for name in names:
         print(name)
 
+@functools.lru_cache(maxsize=None)
 def wiki_title(name):
-    """Like title(), except it never lowercases a letter."""
+    """Like title(), except it never lowercases a letter.
+
+    This is memoized, since the same names get formatted repeatedly.
+    """
     return ''.join(min(x,y) for x,y in zip(name, name.title()))
 
+def _color_repl(match):
+    """Replacement function for COLOR_RE.
+
+    A plain function is faster than a backreference template here, since the
+    template has to be expanded for every match.
+    """
+    return f'<span style="color:{match[1]}">{match[2]}</span>'
+
+_color_sub = COLOR_RE.sub
+
 def color_sub(desc):
     """Replace all <color="#B9DFFFC4">(rare)</color> tags with equivalent HTML.
 
     Also replaces newlines with <br>, which otherwise would get interpreted as
     paragraph breaks.
     """
-    return (COLOR_RE
-        .sub('<span style="color:\\1">\\2</span>', desc)
-        .replace('\n', '<br>'))
+    if '<color=' in desc:
+        desc = _color_sub(_color_repl, desc)
+    return desc.replace('\n', '<br>')
 
-def format_item(item_entry):
-    """Formats an item as a Lua table."""
-    item, disabled = item_entry
+def format_item(item, disabled, out):
+    """Formats an item as a Lua table, appending the text to the list "out"."""
     if item.id == 1121:
         # Deuterium: We discover this on our own, it creates duplicates
         item.produce_from = None
-    fields = {
-        'name':repr(wiki_title(item.name)),
-        'type':repr(item.type.name),
-        'grid_index':item.grid_index,
-        'stack_size':item.stack_size,
-    }
+    out.append(f'    [{item.id}] = {{\n'
+               f'        name={wiki_title(item.name)!r},\n'
+               f'        type={_ITEM_TYPE_NAMES[item.type]!r},\n'
+               f'        grid_index={item.grid_index},\n'
+               f'        stack_size={item.stack_size},\n')
     if item.sub_id:
-        fields['sub_id'] = item.sub_id
+        out.append(f'        sub_id={item.sub_id},\n')
     if item.can_build:
-        fields['can_build'] = 'true'
+        out.append('        can_build=true,\n')
     if item.build_index:
-        fields['build_index'] = item.build_index
+        out.append(f'        build_index={item.build_index},\n')
     if item.is_fluid:
-        fields['is_fluid'] = 'true'
+        out.append('        is_fluid=true,\n')
     if item.heat_value:
-        fields['energy'] = item.heat_value
+        out.append(f'        energy={item.heat_value},\n')
     if item.reactor_inc or item.heat_value:  # Force include if it's a fuel
-        fields['fuel_chamber_boost'] = round(item.reactor_inc, 5)
+        out.append(f'        fuel_chamber_boost={round(item.reactor_inc, 5)},\n')
     if item.unlock_key:
-        fields['unlock_key'] = item.unlock_key
+        out.append(f'        unlock_key={item.unlock_key},\n')
     if item.pre_tech_override:
-        fields['explicit_tech_dep'] = item.pre_tech_override
+        out.append(f'        explicit_tech_dep={item.pre_tech_override},\n')
     if item.mining_from:
-        fields['mining_from'] = repr(color_sub(item.mining_from))
+        out.append(f'        mining_from={color_sub(item.mining_from)!r},\n')
     if item.produce_from:
-        fields['explicit_produce_from'] = repr(wiki_title(item.produce_from))
-    fields['description'] = repr(color_sub(item.description))
+        out.append(f'        explicit_produce_from={wiki_title(item.produce_from)!r},\n')
+    out.append(f'        description={color_sub(item.description)!r},\n')
     if disabled:
-        fields['disabled'] = 'true'
-    return (f'    [{item.id}] = {{\n' +
-            ''.join(f'        {k}={v},\n' for k, v in fields.items()) +
-            f'        --image={item.icon_path.rsplit("/", 1)[1]!r}\n    }},\n')
-
-def format_recipe(recipe_entry):
-    """Formats a recipe as a Lua table."""
-    rec, disabled = recipe_entry
+        out.append('        disabled=true,\n')
+    out.append(f'        --image={item.icon_path.rpartition("/")[2]!r}\n    }},\n')
+
+@functools.lru_cache(maxsize=None)
+def format_seconds(time_spend):
+    """Converts a time_spend in ticks to the Lua value for seconds.
+
+    There are only a few distinct times in the game, so this is memoized.
+    """
+    seconds = round(time_spend / 60.0, 3)
+    if seconds == int(seconds):
+        seconds = int(seconds)  # Changes str() formating
+    if 0 < seconds < 1:
+        # We need the extra precision. Format without leading 0.
+        seconds = repr(str(seconds).lstrip('0'))
+    return seconds
+
+def format_recipe(rec, disabled, out):
+    """Formats a recipe as a Lua table, appending the text to the list "out"."""
     if rec.id == 115:
         # Deuterium Fractionation: The game does a bunch of hacks and so do we.
         if len(rec.result_counts) == 1:
@@ -235,171 +341,164 @@ def format_recipe(recipe_entry):
             rec.result_counts.append(99)
         rec.result_counts = [x / 100.0 for x in rec.result_counts]
         rec.item_counts = [x / 100.0 for x in rec.item_counts]
-    time_spend = round(rec.time_spend / 60.0, 3)
-    if time_spend == int(time_spend):
-        time_spend = int(time_spend)  # Changes str() formating
-    if 0 < time_spend < 1:
-        # We need the extra precision. Format without leading 0.
-        time_spend = repr(str(time_spend).lstrip('0'))
-
-    outputs = ', '.join(str(x) for tup in zip(rec.results, rec.result_counts)
-            for x in tup)
-    inputs = ', '.join(str(x) for tup in zip(rec.items, rec.item_counts)
-            for x in tup)
-    fields = {
-        'id':rec.id,
-        'name':repr(wiki_title(rec.name)),
-        'type':repr(rec.type.name),
-        'outputs':'{' + outputs + '}',
-        'inputs':'{' + inputs + '}',
-        'grid_index':rec.grid_index,
-        'handcraft':'true' if rec.handcraft else 'false',
-        'seconds':time_spend,
-    }
+    outputs = ', '.join([f'{x}, {n}' for x, n in zip(rec.results, rec.result_counts)])
+    inputs = ', '.join([f'{x}, {n}' for x, n in zip(rec.items, rec.item_counts)])
+    out.append(f'{{\n'
+               f'        id={rec.id},\n'
+               f'        name={wiki_title(rec.name)!r},\n'
+               f'        type={_RECIPE_TYPE_NAMES[rec.type]!r},\n'
+               f'        outputs={{{outputs}}},\n'
+               f'        inputs={{{inputs}}},\n'
+               f'        grid_index={rec.grid_index},\n'
+               f'        handcraft={"true" if rec.handcraft else "false"},\n'
+               f'        seconds={format_seconds(rec.time_spend)},\n')
     if rec.explicit:
-        fields['explicit'] = 'true'
+        out.append('        explicit=true,\n')
     if rec.description:
-        fields['description'] = repr(color_sub(rec.description))
+        out.append(f'        description={color_sub(rec.description)!r},\n')
     if disabled:
-        fields['disabled'] = 'true'
-    footer = '    },'
+        out.append('        disabled=true,\n')
     if rec.icon_path:
-        footer = f'        --image={rec.icon_path.rsplit("/", 1)[1]!r}\n    }},'
-    return '{\n' + ''.join(f'        {k}={v},\n' for k, v in fields.items()) + footer
-
-def format_tech(tech):
-    """Formats a tech as a Lua table."""
-    add_items = ', '.join(str(x) for tup in zip(tech.add_items, tech.add_item_counts)
-            for x in tup)
-    research_items = ', '.join(str(x) for tup in zip(tech.items, tech.item_points)
-            for x in tup)
-    recipes = ', '.join(str(x) for x in tech.unlock_recipes)
-    pre_techs = ', '.join(str(x) for x in tech.pre_techs)
-    pre_techs_implicit = ', '.join(str(x) for x in tech.pre_techs_implicit)
-    pre_item = ', '.join(str(x) for x in tech.pre_item)
-    fields = {
-        'id':tech.id,
-        'name':repr(wiki_title(tech.name)),
-        'hash_needed':tech.hash_needed,
-        'inputs':f'{{{research_items}}}',
-    }
+        out.append(f'        --image={rec.icon_path.rpartition("/")[2]!r}\n')
+    out.append('    },')
+
+def format_tech(tech, out):
+    """Formats a tech as a Lua table, appending the text to the list "out"."""
+    add_items = ', '.join([f'{x}, {n}' for x, n in zip(tech.add_items, tech.add_item_counts)])
+    research_items = ', '.join([f'{x}, {n}' for x, n in zip(tech.items, tech.item_points)])
+    recipes = ', '.join(map(str, tech.unlock_recipes))
+    pre_techs = ', '.join(map(str, tech.pre_techs))
+    pre_techs_implicit = ', '.join(map(str, tech.pre_techs_implicit))
+    pre_item = ', '.join(map(str, tech.pre_item))
+    out.append(f'{{\n'
+               f'        id={tech.id},\n'
+               f'        name={wiki_title(tech.name)!r},\n'
+               f'        hash_needed={tech.hash_needed},\n'
+               f'        inputs={{{research_items}}},\n')
     if tech.level_coef1:
-        fields['level_coef1'] = tech.level_coef1
+        out.append(f'        level_coef1={tech.level_coef1},\n')
     if tech.level_coef2:
-        fields['level_coef2'] = tech.level_coef2
+        out.append(f'        level_coef2={tech.level_coef2},\n')
     if recipes:
-        fields['recipes'] = f'{{{recipes}}}'
+        out.append(f'        recipes={{{recipes}}},\n')
     if add_items:
-        fields['add_items'] = f'{{{add_items}}}'
+        out.append(f'        add_items={{{add_items}}},\n')
     if tech.level:
-        fields['level'] = tech.level
+        out.append(f'        level={tech.level},\n')
     if tech.max_level:
-        fields['max_level'] = tech.max_level
+        out.append(f'        max_level={tech.max_level},\n')
     if pre_techs:
-        fields['pre_techs'] = f'{{{pre_techs}}}'
+        out.append(f'        pre_techs={{{pre_techs}}},\n')
     if pre_techs_implicit:
-        fields['pre_techs_implicit'] = f'{{{pre_techs_implicit}}}'
+        out.append(f'        pre_techs_implicit={{{pre_techs_implicit}}},\n')
     if pre_item:
-        fields['pre_item'] = f'{{{pre_item}}}'
+        out.append(f'        pre_item={{{pre_item}}},\n')
     if tech.is_hidden_tech:
-        fields['is_hidden_tech'] = 'true'
-    fields['image'] = repr(tech.icon_path.split('/')[-1])
-    fields['position'] = f'{{{tech.position[0]}, {tech.position[1]}}}'
-    fields['description'] = repr(color_sub(tech.description))
+        out.append('        is_hidden_tech=true,\n')
+    out.append(f'        image={tech.icon_path.rpartition("/")[2]!r},\n'
+               f'        position={{{tech.position[0]}, {tech.position[1]}}},\n'
+               f'        description={color_sub(tech.description)!r},\n')
     if tech.conclusion:
-        fields['conclusion'] = repr(color_sub(tech.conclusion))
+        out.append(f'        conclusion={color_sub(tech.conclusion)!r},\n')
     if not tech.published:
-        fields['disabled'] = 'true'
-    return '{\n' + ''.join(f'        {k}={v},\n' for k, v in fields.items()) + '    },'
+        out.append('        disabled=true,\n')
+    out.append('    },')
 
 def format_facility(facility, items_map):
     """Formats an ERecipeType enum as a Lua table."""
     building_list, power = BUILDINGS.get(facility, ([], 0))
-    buildings = ', '.join(str(x) for x in building_list)
-    building_comment = ', '.join(items_map[x][0].name for x in building_list)
-    return (f'    {facility.name}={{name={MADE_FROM.get(facility, MADE_FROM[None])!r}, ' +
-            f'power={power}, ' +
+    buildings = ', '.join(map(str, building_list))
+    building_comment = ', '.join(items_map[x].name for x in building_list)
+    name = MADE_FROM.get(facility)
+    if name is None:
+        name = MADE_FROM[None]
+    return (f'    {_RECIPE_TYPE_NAMES[facility]}={{name={name!r}, power={power}, '
             f'buildings={{{buildings}}}}},  --{building_comment}\n')
 
 
-def set_valid(items_map, recipe_entry):
-    """Set the given recipe_entry valid, and also the associated item(s)"""
-    recipe_entry[1] = False
+def set_valid(recipe, items_map, disabled_items, disabled_recipes):
+    """Set the given recipe valid, and also the associated item(s)
+
+    Raises KeyError if the recipe produces an item that isn't in items_map.
+    """
+    disabled_recipes.discard(recipe.id)
     # Don't bother checking the inputs, we'll assume that a valid tech
     # means they're attainable.
-    for iid in recipe_entry[0].results:
-        items_map[iid][1] = False
+    for iid in recipe.results:
+        if iid not in items_map:
+            raise KeyError(iid)
+    disabled_items.difference_update(recipe.results)
+
+def recipe_key(recipe, /, _tweak=KEY_TWEAKS.get, _names=_RECIPE_TYPE_NAMES):
+    """Calculate a sort key for recipes
 
-def recipe_key(recipe):
-    """Calculate a sort key for recipes"""
+    The first part of the key determines if this is a building recipe, based
+    on its grid index.
+    """
     key = recipe.id
-    return KEY_TWEAKS.get(key, key)
+    return (recipe.grid_index // 1000, _names[recipe.type], _tweak(key, key))
 
 def create_augmented_maps(data):
     """Create augmented maps to determine whether items/recipes are disabled or not.
 
-    The return is a tuple of (items_map, recipes_map), where each map goes
-    from id -> [object, is_disabled]. For recipes, disabled means it should
-    never be shown. For items, it should still probably be allowed for direct
-    lookups (i.e. Infobox queries), but not for traversals (e.g. creating a
-    grid layout of all the items).
+    The return is a tuple of
+    (items_map, disabled_items, recipes_map, disabled_recipes), where each map
+    goes from id -> object, and each disabled set holds the ids of the entries
+    that are disabled. For recipes, disabled means it should never be shown.
+    For items, it should still probably be allowed for direct lookups (i.e.
+    Infobox queries), but not for traversals (e.g. creating a grid layout of
+    all the items).
     """
     items = data.ItemProtoSet.data_array
-    items.sort(key=lambda x:x.id)
-    items_map = {}
+    items.sort(key=attrgetter('id'))
+    items_map = {item.id: item for item in items}
     # The unlock_key field lets us know for sure that an item is not disabled,
     # and if a recipe is unlocked from a non-disabled tech, or if it is
     # unlocked from the start, then it is not disabled.
-    for item in items:
-        # Second element is whether item is disabled
-        items_map[item.id] = [item, item.unlock_key == 0]
+    disabled_items = {item.id for item in items if item.unlock_key == 0}
 
     recipes = data.RecipeProtoSet.data_array
-    # The first part of the key determines if this is a building recipe, based
-    # on its grid index.
-    recipes.sort(key=lambda x:(
-        x.grid_index // 1000, x.type.name, recipe_key(x)))
-    recipes_map = {}
-    for rec in recipes:
-        # Second element is whether recipe is disabled
-        entry = [rec, True]
-        recipes_map[rec.id] = entry
-        if rec.id in STARTING_RECIPES:
-            set_valid(items_map, entry)
+    recipes.sort(key=recipe_key)
+    recipes_map = {rec.id: rec for rec in recipes}
+    disabled_recipes = set(recipes_map)
 
     techs = data.TechProtoSet.data_array
-    techs.sort(key=lambda x:x.id)
+    # Gather every recipe that's available from the start or unlocked by a
+    # published tech, then mark them all in a single pass.
+    valid_rids = {x for x in STARTING_RECIPES if x in recipes_map}
     for tech in techs:
-        if not tech.published:
-            continue
-        for rid in tech.unlock_recipes:
-            set_valid(items_map, recipes_map[rid])
-    return items_map, recipes_map
+        if tech.published:
+            valid_rids.update(tech.unlock_recipes)
+    for rid in valid_rids:
+        set_valid(recipes_map[rid], items_map, disabled_items, disabled_recipes)
+    return items_map, disabled_items, recipes_map, disabled_recipes
 
 def print_wiki(data):
     """Prints wiki-text dump.
 
     This is designed to replace (most of) what's at Module:Recipe/Data.
     """
-    items_map, recipes_map = create_augmented_maps(data)
-    # Deal with UNLOCK_HACKS.
+    items_map, disabled_items, recipes_map, disabled_recipes = (
+        create_augmented_maps(data))
+    # The techs are output in id order. This also decides UNLOCK_HACKS: If
+    # several techs unlock the same recipe, the last one wins.
     techs = data.TechProtoSet.data_array
+    techs.sort(key=attrgetter('id'))
     for tech in techs:
-        for hack in UNLOCK_HACKS:
-            if hack in tech.unlock_recipes:
-                items_map[recipes_map[hack][0].results[0]][0].pre_tech_override = tech.id
-
-    items_str = ''.join(format_item(x) for x in items_map.values())
-    recipes_str = ''.join(format_recipe(x) for x in recipes_map.values())
-    techs_str = ''.join(format_tech(x) for x in techs)
-    facilities_str = ''.join(format_facility(x, items_map) for x in ERecipeType)
-    starting_recipes_str = ', '.join(str(x) for x in STARTING_RECIPES)
+        for rid in tech.unlock_recipes:
+            if rid in _UNLOCK_HACKS_SET:
+                items_map[recipes_map[rid].results[0]].pre_tech_override = tech.id
+
+    starting_recipes_str = ', '.join(map(str, STARTING_RECIPES))
     special_materials_str = '\n'.join(
-        f'    {x},  -- {items_map[x][0].name}' for x in SPECIAL_MATERIALS)
+        f'    {x},  -- {items_map[x].name}' for x in SPECIAL_MATERIALS)
     categories_str = ''.join(f'    {k.name}={v!r},\n' for k, v in CATEGORIES.items())
     building_categories_str = ''.join(f'    {x!r},\n' for x in BUILDING_CATEGORIES)
 
-    print(f"""return {{
+    # The output is streamed to stdout section by section, rather than
+    # materializing the whole (large) text first.
+    out = sys.stdout
+    out.write("""return {
 --[[
 Data for all the items. Each entry is a table, keyed by the item's id. The
 entries are sorted by id, although you can't count on this when using pairs()
@@ -442,8 +541,13 @@ relevant/present for the given item. The valid fields are:
             as stored in the game files. It should be renamed to the item's
             name when uploaded.
 ]]
-game_items = {{
-{items_str}}},
+game_items = {
+""")
+    parts = []
+    for x in items_map.values():
+        format_item(x, x.id in disabled_items, parts)
+    out.write(''.join(parts))
+    out.write("""},
 
 --[[
 Data for all the recipes. Each entry is a table, stored as a flat array. The
@@ -482,9 +586,14 @@ relevant/present for the given recipe. The valid fields are:
             as stored in the game files. It should be renamed to the item's
             name when uploaded. Generally only present for explicit recipes.
 ]]
-game_recipes = {{
-    {recipes_str}
-}},
+game_recipes = {
+    """)
+    parts = []
+    for x in recipes_map.values():
+        format_recipe(x, x.id in disabled_recipes, parts)
+    out.write(''.join(parts))
+    out.write("""
+},
 
 --[[
 Data for all the techs. Each entry is a table, stored as a flat array. The
@@ -538,9 +647,14 @@ relevant/present for the given tech. The valid fields are:
     disabled - If true, this tech shows up in the tech tree, but isn't
                available yet.
 ]]
-game_techs = {{
-    {techs_str}
-}},
+game_techs = {
+    """)
+    parts = []
+    for x in techs:
+        format_tech(x, parts)
+    out.write(''.join(parts))
+    out.write("""
+},
 
 -- These (below this point) don't come from the game files, because they're
 -- totally buried in the game logic.
@@ -549,8 +663,10 @@ game_techs = {{
 -- and an array of item ids of buildings that can produce those types of recipes.
 -- The power field measures the power usage of the facility, divided by its
 -- production speed (so its effective power usage to craft at 1s nominal.)
-game_facilities = {{
-{facilities_str}}},
+game_facilities = {
+""")
+    out.writelines(format_facility(x, items_map) for x in ERecipeType)
+    out.write(f"""}},
 
 -- This is just an array of what you start out being able to craft.
 -- (Both in the replicator, and in buildings once you get them.)
@@ -570,7 +686,8 @@ categories = {{
 -- in-game to the name of the category.
 building_categories = {{
 {building_categories_str}}},
-}}""")
+}}
+""")
 
 def fuzzy_lookup_item(name_or_id, lst):
     """Lookup an item by either name or id.
@@ -624,11 +741,21 @@ def main():
                         help='Dump everything')
     parser.add_argument('--wiki', action='store_true',
                         help='Print wiki text for Module:Recipe/Data')
+    parser.add_argument('--no_cache', action='store_true',
+                        help=f"Don't read or write the data cache in {CACHE_FILE}")
     args = parser.parse_args()
 
+    # A single lookup only needs its own data file, so skip parsing the others.
+    lookups = [name for name, query in zip(
+        PROTO_SETS, (args.find_item, args.find_recipe, args.find_tech)) if query]
     print('Reading data... ', end='', flush=True, file=sys.stderr)
-    data = dysonsphere.load_all()
-    translate_data(data)
+    data = load_game_data(lookups if len(lookups) == 1 else None,
+                          not args.no_cache)
+    # Everything except the name dumps prints descriptions too. (The --find_*
+    # flags print the whole object.)
+    names_only = (not lookups and not args.dump_all and
+                  (args.dump_item_names or args.dump_tech_names))
+    translate_data(data, full=not names_only)
     print('Done!', flush=True, file=sys.stderr)
 
     try:
@@ -21,12 +21,16 @@ call load_data() to load a single data type.
 """
 # pylint: disable=too-few-public-methods,too-many-lines,unused-import
 
+from array import array
 import collections
 from contextlib import closing
 from enum import IntEnum
+import functools
 import io
+from itertools import groupby
 from os import path
-from struct import unpack
+from struct import Struct
+import sys
 
 __all__ = [
     'EItemType', 'ERecipeType',
@@ -36,6 +40,57 @@ __all__ = [
 
 _DEBUG = False
 
+# Precompiled unpackers for the scalar types, used by the generated code.
+# These skip the format-string lookup that struct.unpack() does per call.
+_I32 = Struct('<i').unpack
+_I64 = Struct('<q').unpack
+_F32 = Struct('<f').unpack
+_F64 = Struct('<d').unpack
+_VEC2 = Struct('<ff').unpack
+_SWAP_ARRAYS = sys.byteorder != 'little'
+# The array typecodes are C types, so their sizes are platform-dependent. Pick
+# ones of the right size, or fall back to Struct if there aren't any.
+_INT32_CODE = next((x for x in 'il' if array(x).itemsize == 4), None)
+_DOUBLE_CODE = 'd' if array('d').itemsize == 8 else None
+
+def _read_int32_array(read_fun, /):
+    """Read a length-prefixed array of int32s with a single bulk read."""
+    alen = _I32(read_fun(4))[0]
+    if alen <= 0:
+        return []
+    if _INT32_CODE is None:
+        return list(Struct(f'<{alen}i').unpack(read_fun(4 * alen)))
+    arr = array(_INT32_CODE)
+    arr.frombytes(read_fun(4 * alen))
+    if _SWAP_ARRAYS:
+        arr.byteswap()
+    return arr.tolist()
+
+def _read_double_array(read_fun, /):
+    """Read a length-prefixed array of doubles with a single bulk read."""
+    alen = _I32(read_fun(4))[0]
+    if alen <= 0:
+        return []
+    if _DOUBLE_CODE is None:
+        return list(Struct(f'<{alen}d').unpack(read_fun(8 * alen)))
+    arr = array(_DOUBLE_CODE)
+    arr.frombytes(read_fun(8 * alen))
+    if _SWAP_ARRAYS:
+        arr.byteswap()
+    return arr.tolist()
+
+def _read_objects(clz, read_fun, tell_fun, /):
+    """Read a length-prefixed array of clz objects.
+
+    This skips the constructor, creating each object bare and parsing it with
+    _init_from_stream() directly, which avoids the type call, the default
+    case check, and the kwargs dict for every element.
+    """
+    init = clz._init_from_stream  # pylint: disable=protected-access
+    new = object.__new__
+    return [init(new(clz), read_fun, tell_fun)
+            for x in range(_I32(read_fun(4))[0])]
+
 class _Reader:
     """Reads binary data from a file stream.
 
@@ -98,13 +153,17 @@ class _Codegen:
     and are off the common path.
     """
 
+    def __init__(self):
+        # Structs for the scalar runs used by the generated code, by name
+        self.helpers = {}
+
     def read_float(self):
         """Read a single-precision float"""
-        return "unpack('f', read_fun(4))[0]"
+        return "_F32(read_fun(4))[0]"
 
     def read_double(self):
         """Read a double-precision float"""
-        return "unpack('d', read_fun(8))[0]"
+        return "_F64(read_fun(8))[0]"
 
     def read_bool(self):
         """Helper for reading a single bool.
@@ -114,11 +173,11 @@ class _Codegen:
 
     def read_int32(self):
         """Helper for reading a single int32"""
-        return "int.from_bytes(read_fun(4), 'little', signed=True)"
+        return "_I32(read_fun(4))[0]"
 
     def read_int64(self):
         """Helper for reading a single int64"""
-        return "int.from_bytes(read_fun(8), 'little', signed=True)"
+        return "_I64(read_fun(8))[0]"
 
     def read_string(self, name):
         """Read a base UTF-8 string
@@ -138,7 +197,7 @@ class _Codegen:
     @staticmethod
     def _read_base_string(read_fun):
         """Performs actual string reading, primarily in debug"""
-        slen = int.from_bytes(read_fun(4), 'little', signed=True)
+        slen = _I32(read_fun(4))[0]
         if _DEBUG:
             print(f'String size: 0x{slen:X}')
         result = read_fun(slen).decode()
@@ -153,38 +212,87 @@ class _Codegen:
     @staticmethod
     def read_array_real(clz, read_fun, tell_fun, /):
         """Performs actual array parsing, but not primarily used in non-debug"""
-        alen = int.from_bytes(read_fun(4), 'little', signed=True)
+        alen = _I32(read_fun(4))[0]
         if _DEBUG:
             print(f'Array len: {alen} for {clz.__name__}')
-        return [clz(read_fun, tell_fun) for x in range(alen)]
+        init = clz._init_from_stream  # pylint: disable=protected-access
+        return [init(object.__new__(clz), read_fun, tell_fun)
+                for x in range(alen)]
 
     def read_array(self, cls_name, /):
         """Read an array of objects"""
         if _DEBUG:
             return f'_Codegen.read_array_real({cls_name}, read_fun, tell_fun)'
-        return f"[{cls_name}(read_fun, tell_fun) for i in range({self.read_int32()})]"
+        return f"_read_objects({cls_name}, read_fun, tell_fun)"
 
     def read_array_int32(self):
         """Read an array of int32s."""
-        return f"[{self.read_int32()} for x in range({self.read_int32()})]"
+        return "_read_int32_array(read_fun)"
 
     def read_array_double(self):
         """Read an array of double."""
-        return f"[{self.read_double()} for x in range({self.read_int32()})]"
+        return "_read_double_array(read_fun)"
 
     def read_vector2f(self):
         """Read a pair of floats."""
-        return f"({self.read_float()}, {self.read_float()})"
+        return "_VEC2(read_fun(8))"
+
+    # The struct format of each fixed-size type, for read_scalar_run()
+    SCALAR_FORMATS = {
+        'int32': 'i', 'int64': 'q', 'float': 'f', 'double': 'd',
+        'bool': 'i', 'enum': 'i', 'vector2f': 'ff'}
+
+    def read_scalar_run(self, fields, /):
+        """Read a run of consecutive fixed-size fields with one unpack.
+
+        Like read_string(), this returns statements. "fields" is a list of
+        (name, method_name, arg) tuples. Fields that need converting after
+        unpacking (bools, enums and vectors) go through temporaries. The
+        unpacker is added to self.helpers, named after its format, so that
+        runs with the same layout share it.
+        """
+        fmt = ''.join(self.SCALAR_FORMATS[x[1]] for x in fields)
+        unpacker = '_RUN_' + fmt
+        run = self.helpers.get(unpacker)
+        if run is None:
+            run = Struct('<' + fmt)
+            self.helpers[unpacker] = run
+        targets = []
+        converts = []
+        for name, method_name, arg in fields:
+            if method_name == 'bool':
+                targets.append(name + '_')
+                converts.append(f'    self.{name} = bool({name}_)')
+            elif method_name == 'enum':
+                targets.append(name + '_')
+                converts.append(f'    self.{name} = {arg}({name}_)')
+            elif method_name == 'vector2f':
+                targets += [name + '_x', name + '_y']
+                converts.append(f'    self.{name} = ({name}_x, {name}_y)')
+            else:
+                targets.append('self.' + name)
+        return '\n'.join([
+            f"    {', '.join(targets)} = {unpacker}(read_fun({run.size}))",
+            *converts])
 
     def read_bad_type(self):
         """Used to check that a given class is never deserialized."""
         return "0; raise ValueError('Tried to parse unexpected type')"
 
     def generate_init(self, layout, cls_name, /):
-        """Generates the dynamic __init__ code for the given class layout"""
+        """Generates the dynamic __init__ code for the given class layout.
+
+        This is split in two: __init__() handles the default constructor
+        case, and _init_from_stream() does the actual parsing, without any
+        branching or kwargs handling. __init__() forwards to it if given a
+        reader, but the parsing code calls it directly, on objects made with
+        object.__new__(). It returns self, to make that easy.
+        """
         code = ["""def __init__(self, read_fun=None, tell_fun=None, /, **kwargs):
-    if read_fun is None:"""]
-        # Start with code to initialize the object as a tuple, including the
+    if read_fun is not None:
+        self._init_from_stream(read_fun, tell_fun)
+        return"""]
+        # Start with code to initialize the object as a tuple, for the
         # default constructor case.
         for name, typ in layout:
             if typ.startswith('string'):
@@ -195,25 +303,45 @@ class _Codegen:
                 value = False
             else:
                 value = 0
-            code.append(f'        self.{name} = {value!r}')
-        code.append("""        for k, v in kwargs.items():
-            setattr(self, k, v)
-        return""")
-        # Otherwise, if there is a reader initialize from it.
+            code.append(f'    self.{name} = {value!r}')
+        code.append("""    for k, v in kwargs.items():
+        setattr(self, k, v)
+""")
+        code.append(self.generate_init_from_stream(layout, cls_name))
+        return '\n'.join(code)
+
+    def generate_init_from_stream(self, layout, cls_name, /):
+        """Generates the _init_from_stream() half of generate_init()."""
+        code = []
+        fields = []
         for name, typ in layout:
-            if _DEBUG:
-                code.append(
-                    f"    print(f'@{{tell_fun():X}} {cls_name} {name}')")
             index = typ.index('(')
-            method_name = typ[:index]
-            method = getattr(self, 'read_' + method_name)
-            args = []
-            if index < len(typ) - 2:
-                args.append(typ[index+1:-1])
-            if method_name == 'string':
-                code.append(method(name, *args))
-            else:
-                code.append(f'    self.{name} = ' + method(*args))
+            fields.append((name, typ[:index], typ[index+1:-1]))
+        # Runs of fixed-size fields are read with a single unpack, except in
+        # debug, where we want to print every field.
+        for is_scalar, group in groupby(
+                fields, lambda x: not _DEBUG and x[1] in self.SCALAR_FORMATS):
+            group = list(group)
+            if is_scalar and len(group) > 1:
+                code.append(self.read_scalar_run(group))
+                continue
+            for name, method_name, arg in group:
+                if _DEBUG:
+                    code.append(
+                        f"    print(f'@{{tell_fun():X}} {cls_name} {name}')")
+                method = getattr(self, 'read_' + method_name)
+                args = [arg] if arg else []
+                if method_name == 'string':
+                    code.append(method(name, *args))
+                else:
+                    code.append(f'    self.{name} = ' + method(*args))
+        code.append('    return self')
+        # The header comes last, once the run unpackers that the body needs
+        # are known. They are passed in as keyword-only defaults, which are
+        # evaluated in the exec namespace (see Object.__init_subclass__).
+        extra = ''.join(f', {x}={x}' for x in self.helpers)
+        code.insert(0, 'def _init_from_stream(self, read_fun, tell_fun, /'
+                    + (', *' + extra if extra else '') + '):')
         return '\n'.join(code)
 
     def generate_do_all(self, layout, cls_name, /):
@@ -233,6 +361,76 @@ class _Codegen:
                 tmp.do_all(fun)""")
         return '\n'.join(code)
 
+    def generate_repr(self, layout, cls_name, /):
+        """Generates the dynamic __repr__ code for the given class layout.
+
+        This prints all the attributes of the class. The result should be an
+        expression that will round-trip back to the original result (assuming
+        you did import * form dysonsphere), although it will probably be
+        unreadably large in the complicated cases.
+        """
+        fields = ', '.join(f'{name}={{self.{name}!r}}' for name, _ in layout)
+        return f"""def __repr__(self):
+    return f'{cls_name}({fields})'"""
+
+    def generate_str(self, layout, cls_name, /):
+        """Generates the dynamic __str__ code for the given (sorted) layout.
+
+        This prints non-default attributes of the class. It skips printing all
+        fields that have "default" values, i.e. that evaluate to False in a
+        boolean context. So: None, 0, '', [], etc. Like repr(), this produces
+        an expression that should produce the original result, modulo minor
+        differences like where a string might have been ommitted entirely
+        (None) and will be reconstructed as ''.
+        """
+        code = ["""def __str__(self):
+    acc = []"""]
+        for name, typ in layout:
+            code.append(f"""    val = self.{name}
+    if val:""")
+            if typ.startswith('array'):
+                # Arrays are always of either objects or ints, so either way
+                # we want to recurse with str().
+                code.append(f"""        if isinstance(val, list):
+            acc.append(f"{name}=[{{', '.join(map(str, val))}}]")
+        else:
+            acc.append(f'{name}={{val!r}}')""")
+            else:
+                # Objects need to be recursively expanded with str(). Enums
+                # need to use str() because repr() doesn't produce an
+                # expression which evaluates to the value (which is against
+                # style). Everything else should use repr().
+                conv = ('s' if typ.startswith('object') or
+                        typ.startswith('enum') else 'r')
+                code.append(f"        acc.append(f'{name}={{val!{conv}}}')")
+        code.append(f"    return '{cls_name}(' + ', '.join(acc) + ')'")
+        return '\n'.join(code)
+
+    def generate_find_all(self, layout, /):
+        """Generates the dynamic _find_all code for the given class layout.
+
+        Subobject fields are only descended into if _reaches() says that
+        their type can contain the type being searched for. Types are passed
+        by name, and resolved relative to the class, so this doesn't depend
+        on the classes living in this module.
+        """
+        code = ["""def _find_all(self, cls, acc, /):
+    own_cls = type(self)
+    if cls is own_cls:
+        acc.append(self)"""]
+        for name, typ in layout:
+            if typ.startswith('object'):
+                code.append(f"""    tmp = self.{name}
+    if tmp and _reaches(own_cls, {typ[typ.index('(')+1:-1]!r}, cls):
+        tmp._find_all(cls, acc)""")
+            elif typ.startswith('array('):
+                code.append(f"""    arr = self.{name}
+    if arr and _reaches(own_cls, {typ[6:-1]!r}, cls):
+        for tmp in arr:
+            if tmp:
+                tmp._find_all(cls, acc)""")
+        return '\n'.join(code)
+
 
 class Object:
     """Generic object base type that powers the rest of the type hierarchy.
@@ -255,77 +453,37 @@ class Object:
             if not field[1][-1] == ')':
                 field[1] += '()'
         cls.__slots__ = tuple(x[0] for x in layout)
+        # We sort these to the front in str().
+        front_attrs = ('id', 'name', 'description')
+        str_layout = [
+            (front_attrs.index(v[0]) - 100 if v[0] in front_attrs else i,
+                v[0], v[1]) for i,v in enumerate(layout)]
+        str_layout.sort()
+        str_layout = [x[1:] for x in str_layout]
         # We dynamically create this code, so that it will be compiled once
         # and then run at full speed.
-        localz = {}
-        exec(compile(_Codegen().generate_init(layout, cls.__name__) + '\n' +
-                     _Codegen().generate_do_all(layout, cls.__name__),
+        codegen = _Codegen()
+        init_code = codegen.generate_init(layout, cls.__name__)
+        # Seed the exec namespace with the helpers that generate_init()
+        # needs. These are bound as defaults, so they aren't needed later.
+        helpers = {name: run.unpack for name, run in codegen.helpers.items()}
+        localz = dict(helpers)
+        exec(compile(init_code + '\n' +
+                     _Codegen().generate_do_all(layout, cls.__name__) + '\n' +
+                     _Codegen().generate_find_all(layout) + '\n' +
+                     _Codegen().generate_repr(layout, cls.__name__) + '\n' +
+                     _Codegen().generate_str(str_layout, cls.__name__),
                      f'<dynamic {cls.__name__} code>', 'exec'),
              globals(), localz)
-        __init__ = localz['__init__']
-        __init__.__qualname__ = f'{cls.__name__}.__init__'
-        cls.__init__ = __init__
-        do_all_fun = localz['do_all']
-        do_all_fun.__qualname__ = f'{cls.__name__}.do_all'
-        cls.do_all = do_all_fun
-        # Precompute replacement string for speed
-        fmt = ', '.join(x + '={!r}' for x in cls.__slots__)
-        cls._repr_format = f'{cls.__name__}({fmt})'
-
-        # We sort these to the front.
-        front_attrs = ('id', 'name', 'description')
-        str_attrs = [
-            (front_attrs.index(v[0]) - 100 if v[0] in front_attrs else i,
-                v[0], v[1]) for i,v in enumerate(layout)]
-        str_attrs.sort()
-        # Objects need to be recursively expanded with str(). Enums need to
-        # use str() because repr() doesn't produce an expression which
-        # evaluates to the value (which is against style). Lists are handled
-        # specially, and will use str() because they contain Objects (or
-        # ints). Everything else should use repr().
-        str_attrs = [(x[1], x[1] + (
-            '={!s}' if x[2].startswith('object') or x[2].startswith('enum')
-            else '={!r}')) for x in str_attrs]
-        cls._str_attrs = str_attrs
-        cls._str_begin = f'{cls.__name__}('
-
-    def __repr__(self):
-        """Print all the attributes of the class.
-
-        The result should be an expression that will round-trip back to the
-        original result (assuming you did import * form dysonsphere),
-        although it will probably be unreadably large in the complicated
-        cases.
-        """
-        return self._repr_format.format(
-                *[getattr(self, x) for x in self.__slots__])
-
-    def __str__(self):
-        """Print non-default attributes of the class.
-
-        This skips printing all fields that have "default" values, i.e. that
-        evaluate to False in a boolean context. So: None, 0, '', [], etc.
-        Like repr(), this produces an expression that should produce the
-        original result, modulo minor differences like where a string might
-        have been ommitted entirely (None) and will be reconstructed as ''.
-        """
-        acc = []
-        for attr, fmt in self._str_attrs:
-            value = getattr(self, attr)
-            if not value:
+        for name, fun in localz.items():
+            if name in helpers:
                 continue
-            if not isinstance(value, list):
-                acc.append(fmt.format(value))
-            else:
-                # Special handling for arrays: This takes advantage of the
-                # fact that it shares the same delimiter: ', '. Arrays are
-                # always of either objects or ints, so either way we want to
-                # recurse with str().
-                sublist = [str(x) for x in value]
-                sublist[0] = attr + '=[' + sublist[0]
-                sublist[-1] += ']'
-                acc.extend(sublist)
-        return self._str_begin + ', '.join(acc) + ')'
+            fun.__qualname__ = f'{cls.__name__}.{name}'
+            setattr(cls, name, fun)
+        # Names of the types of subobjects, for _reaches()
+        cls._child_types = tuple(
+            typ[typ.index('(')+1:-1] for _, typ in layout
+            if typ.startswith('object') or typ.startswith('array('))
 
 
 class EAmmoType(IntEnum):
@@ -527,20 +685,28 @@ def load_data(data_type, filename=None, /):
         filename = data_type + '.dat'
     cls = _ALL_DATA_TYPES[_VALID_TYPES.index(data_type)][1]
     with closing(_Reader(filename)) as reader:
-        return cls(*reader.get_funcs())
+        # pylint: disable=protected-access
+        return cls._init_from_stream(cls.__new__(cls), *reader.get_funcs())
 
 GameData = collections.namedtuple('GameData', _VALID_TYPES + _VALID_TXTS)
 GameData.__doc__ = """namedtuple result type of load_all()"""
 
-def load_all(root_dir='.', /):
+def load_all(root_dir='.', data_types=None, /):
     """Load all the data files into a GameData namedtuple.
 
     "root_dir" can be specified to load the data from somewhere else. If the
     files have non-standard names, use load_data() instead.
 
+    "data_types" can be a list of data types (as for load_data()) to load only
+    a subset of the .dat files; the fields for the rest are set to None. The
+    .txt files are always loaded.
+
     The fields on the tuple have the same names as the data files, but without
     '.dat' - for instance events.dat is loaded into events."""
-    result = dict((x, load_data(x, path.join(root_dir, x + '.dat')))
+    if data_types is None:
+        data_types = _VALID_TYPES
+    result = dict((x, load_data(x, path.join(root_dir, x + '.dat'))
+                   if x in data_types else None)
                   for x in _VALID_TYPES)
     for x in _VALID_TXTS:
         with open(path.join(root_dir, x + '.txt'), encoding="utf-16") as f:
@@ -574,16 +740,55 @@ def do_all(obj, fun, /):
         for val in obj:
             val.do_all(fun)
 
+def _resolve_type(owner, name, /):
+    """Find the class called "name", as referenced by a layout in owner.
+
+    This looks in the module defining owner, then in this one. Returns None
+    if it can't be found.
+    """
+    module = sys.modules.get(owner.__module__)
+    return getattr(module, name, None) or globals().get(name)
+
+@functools.lru_cache(maxsize=None)
+def _reaches(owner, name, cls, /):
+    """Whether a field of owner of type "name" can be, or contain, a cls.
+
+    This is a search over the layouts with a visited set, so self-referential
+    layouts are fine. Types that can't be resolved are assumed to reach cls,
+    which only costs a wasted descent.
+    """
+    # pylint: disable=protected-access
+    stack = [(owner, name)]
+    seen = set()
+    while stack:
+        clz = _resolve_type(*stack.pop())
+        if clz is None or clz is cls:
+            return True
+        if clz in seen:
+            continue
+        seen.add(clz)
+        stack.extend((clz, x) for x in clz._child_types)
+    return False
+
 def find_all(obj, cls, /):
     """Find all instances of cls recursively across obj.
 
-    This uses do_all() to recursively search inside obj (including obj
-    itself) for instances where the type is "cls". It will only work for
-    subtypes of dysonsphere.Object, i.e. you can't find all ints this way.
+    This searches inside obj (including obj itself) for instances where the
+    type is "cls", in the same order as do_all(). It doesn't call a function
+    per node like do_all() does, and it skips over subobjects whose types
+    can't contain a "cls". It will only work for subtypes of
+    dysonsphere.Object, i.e. you can't find all ints this way.
+
+    "obj" can be an Object, an iterable of them, or a GameData.
     """
+    # pylint: disable=protected-access
     acc = []
-    def find_fun(res, res_cls, /):
-        if res_cls == cls:
-            acc.append(res)
-    do_all(obj, find_fun)
+    if isinstance(obj, Object):
+        obj._find_all(cls, acc)
+    else:
+        if isinstance(obj, GameData):
+            obj = obj[:len(_VALID_TYPES)]  # Skip the .txt data
+        for val in obj:
+            if val:
+                val._find_all(cls, acc)
     return acc